@@ -0,0 +1,97 @@
+import time
+
+import pygame
+
+# A 512 sample buffer keeps the delay between an event and its sound around 10 ms
+FREQUENCY = 44100
+SIZE = -16
+STEREO = 2
+BUFFER = 512
+
+# Channels reserved for each sound class. A class only ever plays on its own
+# channels, so a burst of coins can't take the channel the crash needs.
+CHANNELS = {
+    "music": 1,
+    "crash": 1,
+    "victory": 1,
+    "ui": 1,
+    "coin": 3,
+}
+
+
+# Must run before pygame.init() / pygame.mixer.init() to take effect
+def pre_init():
+    pygame.mixer.pre_init(FREQUENCY, SIZE, STEREO, BUFFER)
+
+
+def load_sound(path):
+    try:
+        sound = pygame.mixer.Sound(path)
+        return sound
+    except Exception as e:
+        print(f"Error loading sound: {path}. {e}")
+        return None
+
+
+class AudioEngine:
+    def __init__(self, sounds, music_path=None):
+        # sounds maps a name to (path, sound class)
+        self.enabled = True
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+        except pygame.error as e:
+            print(f"Audio disabled. {e}")
+            self.enabled = False
+            return
+
+        total = sum(CHANNELS.values())
+        pygame.mixer.set_num_channels(max(total, pygame.mixer.get_num_channels()))
+        # Reserved channels are never picked by Sound.play(), only by us
+        pygame.mixer.set_reserved(total)
+        self.channels = {}
+        index = 0
+        for sound_class, count in CHANNELS.items():
+            self.channels[sound_class] = [pygame.mixer.Channel(index + i) for i in range(count)]
+            index += count
+        self.started = {}
+
+        # Everything is decoded once here and stays resident
+        self.samples = {}
+        self.classes = {}
+        for name, (path, sound_class) in sounds.items():
+            self.samples[name] = load_sound(path)
+            self.classes[name] = sound_class
+        self.music = load_sound(music_path) if music_path else None
+        self.music_channel = self.channels["music"][0]
+
+    def play(self, name):
+        if not self.enabled or self.samples.get(name) is None:
+            return
+        channels = self.channels[self.classes[name]]
+        channel = None
+        for candidate in channels:
+            if not candidate.get_busy():
+                channel = candidate
+                break
+        if channel is None:
+            # Voice stealing: the oldest sound in the class makes way
+            channel = min(channels, key=lambda c: self.started.get(c, 0))
+        channel.play(self.samples[name])
+        self.started[channel] = time.perf_counter()
+
+    def play_music(self):
+        if self.enabled and self.music:
+            self.music_channel.play(self.music, loops=-1)
+
+    def pause_music(self):
+        if self.enabled:
+            self.music_channel.pause()
+
+    def unpause_music(self):
+        if self.enabled:
+            self.music_channel.unpause()
+
+    def stop_music(self):
+        if self.enabled:
+            self.music_channel.stop()
@@ -0,0 +1,95 @@
+import numpy as np
+
+from driving import COIN_SPEED, PLAYER_BOOST_SPEED, PLAYER_SPEED, SCREEN_WIDTH, KeyState
+
+# Frames looked ahead, one second at 60 FPS
+HORIZON = 60
+# Frames a plan holds its steering before it goes straight
+HOLDS = (4, 12, 24, HORIZON)
+
+
+def make_plans():
+    # Every plan is (steer, boost, hold); steer is -1 left, 0 straight, 1 right
+    plans = []
+    for boost in (True, False):
+        plans.append((0, boost, 0))
+        for steer in (-1, 1):
+            for hold in HOLDS:
+                plans.append((steer, boost, hold))
+    return plans
+
+
+PLANS = make_plans()
+
+
+# Picks keys for the player by scoring a fixed set of steering/boost plans.
+# Everything on the road moves straight down at a constant speed, so where
+# each car and coin will be is known exactly for the whole horizon; the only
+# unknown is what spawns in the meantime. Callable with a Round like the
+# tournament policies, and returns a KeyState for Player.update.
+class Autopilot:
+    def __init__(self, horizon=HORIZON):
+        self.horizon = horizon
+        self.frames = np.arange(1, horizon + 1, dtype=np.float32)
+        steps = []
+        for steer, boost, hold in PLANS:
+            speed = PLAYER_BOOST_SPEED if boost else PLAYER_SPEED
+            step = np.zeros(horizon, dtype=np.float32)
+            step[:hold] = steer * speed
+            steps.append(step)
+        # Lateral offset of the player after each frame, per plan: (plans, horizon)
+        self.offsets = np.cumsum(steps, axis=1)
+        self.steer = np.array([plan[0] for plan in PLANS])
+        self.boost = np.array([plan[1] for plan in PLANS])
+        self.keys = [KeyState(left=steer < 0, right=steer > 0, up=boost) for steer, boost, _ in PLANS]
+        self.last = 0
+
+    def entities(self, race):
+        rects, speeds = [], []
+        for enemy in race.enemies:
+            rects.append(enemy.rect)
+            speeds.append(enemy.speed)
+        base_speed = race.config["base_speed"]
+        for enemy in race.same_direction_enemies:
+            rects.append(enemy.rect)
+            speeds.append(base_speed)
+        return rects, speeds
+
+    def first_hits(self, player, left, right, rects, speeds):
+        # Per plan: frame of the first overlap with any of `rects` (horizon + 1 if
+        # none) and whether there is one at all
+        if not rects:
+            return np.full(len(PLANS), self.horizon + 1), np.zeros(len(PLANS), dtype=bool)
+        boxes = np.array([(r.left, r.right, r.top, r.bottom) for r in rects], dtype=np.float32)
+        speeds = np.array(speeds, dtype=np.float32)
+        # Vertical overlap only depends on time: (horizon, entities)
+        moved = self.frames[:, None] * speeds[None, :]
+        vertical = (boxes[None, :, 2] + moved < player.bottom) & (boxes[None, :, 3] + moved > player.top)
+        # Horizontal overlap per plan and time: (plans, horizon, entities)
+        horizontal = (left[:, :, None] < boxes[None, None, :, 1]) & (right[:, :, None] > boxes[None, None, :, 0])
+        hits = (horizontal & vertical[None]).any(axis=2)
+        hit = hits.any(axis=1)
+        return np.where(hit, hits.argmax(axis=1) + 1, self.horizon + 1), hit
+
+    def __call__(self, race):
+        player = race.player.rect
+        # Same limits as Player.update, which stops at the screen edges
+        left = np.clip(player.left + self.offsets, 0, SCREEN_WIDTH - player.width)
+        right = left + player.width
+
+        rects, speeds = self.entities(race)
+        time_to_collision, _ = self.first_hits(player, left, right, rects, speeds)
+        coins = [coin.rect for coin in race.coins]
+        _, collects = self.first_hits(player, left, right, coins, [COIN_SPEED] * len(coins))
+
+        # Survive first, then coins, then boost (it starts the finish clock), then
+        # stay central with room to dodge, and don't flip steering every frame
+        centre = np.abs(left[:, -1] + player.width / 2 - SCREEN_WIDTH / 2) / SCREEN_WIDTH
+        score = (time_to_collision * 100.0
+                 + collects * 40.0
+                 + self.boost * 10.0
+                 - centre * 20.0
+                 - (self.steer != self.last) * 5.0)
+        best = int(score.argmax())
+        self.last = self.steer[best]
+        return self.keys[best]
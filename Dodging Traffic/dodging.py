@@ -1,14 +1,23 @@
+import time
+
+# Taken before anything else is imported so --profile-startup covers the imports
+STARTED = time.perf_counter()
+
 import pygame
 import sys
+import os
+import math
 import random
-import time
+import functools
 
-# Initialize Pygame
-pygame.init()
-
-# Screen dimensions
-SCREEN_WIDTH = 500
-SCREEN_HEIGHT = 600
+import audio
+from audio import AudioEngine
+from autopilot import Autopilot
+from driving import SCREEN_WIDTH, SCREEN_HEIGHT, PLAYER_SPEED, PLAYER_BOOST_SPEED, COIN_SPEED
+from particles import ParticleSystem, CRASH, COIN, BOOST
+from profiling import StartupProfiler
+from renderer import RENDERERS, select_renderer
+from scores import ScoreStore
 
 # Colors
 WHITE = (255, 255, 255)
@@ -17,25 +26,84 @@ BLACK = (0, 0, 0)
 # Frame rate
 FPS = 60
 
-
-def load_image(path, width=None, height=None):
-    try:
-        image = pygame.image.load(path).convert_alpha()
-        if width and height:
-            image = pygame.transform.scale(image, (width, height))
-        return image
-    except Exception as e:
-        print(f"Error loading image: {path}. {e}")
-        return pygame.Surface((width or 50, height or 50))
-
-
-def load_sound(path):
-    try:
-        sound = pygame.mixer.Sound(path)
-        return sound
-    except Exception as e:
-        print(f"Error loading sound: {path}. {e}")
-        return None
+# Drawn size of each sprite, which is also where its hitbox comes from
+SPRITE_SIZES = {
+    "player": (100, 120),
+    "enemy": (110, 125),
+    "same_direction": (110, 125),
+    # Level 2 oncoming car, drawn with the same-direction sprite
+    "slow_car": (110, 125),
+    "rock": (60, 70),
+    "coin": (70, 70),
+}
+
+# Tuning per level, times are in seconds. A Round copies these so a run can
+# override single values.
+LEVELS = {
+    1: {
+        "base_speed": 5,
+        "boost_speed": 4,
+        "coin_interval": 2,
+        "enemy_interval": 3,
+        "same_dir_interval": 5,
+        "burst": (0, 0),
+        "enemy_kinds": (),
+        "match_street_speed": False,
+        "speed_jitter": (0, 0),
+        "finish_time": 60,
+    },
+    2: {
+        "base_speed": 5,
+        "boost_speed": 4,
+        "coin_interval": 2,
+        "enemy_interval": 3,
+        "same_dir_interval": 5,
+        "burst": (1, 1),
+        "enemy_kinds": ("slow_car", "rock"),
+        "match_street_speed": False,
+        "speed_jitter": (0, 0),
+        "finish_time": 60,
+    },
+    3: {
+        "base_speed": 5,
+        "boost_speed": 4,
+        "coin_interval": 2,
+        "enemy_interval": 3,
+        "same_dir_interval": 5,
+        "burst": (2, 4),
+        "enemy_kinds": ("enemy", "rock"),
+        "match_street_speed": True,
+        "speed_jitter": (0, 3),
+        "finish_time": 60,
+    },
+}
+
+# Seconds without input on the start screen before the autopilot demo starts
+ATTRACT_AFTER = 15
+
+# Dropped into the game folder, this font is used instead of the one shipped with pygame
+BUNDLED_FONT = "font.ttf"
+
+
+# Only start what the game uses instead of every pygame subsystem.
+# The mixer is set up for low latency here and opened by the audio engine.
+def init():
+    audio.pre_init()
+    pygame.display.init()
+    pygame.font.init()
+
+
+# Resolved once, pygame.font.SysFont would scan every installed font on each call
+@functools.lru_cache(maxsize=None)
+def font_path():
+    if os.path.exists(BUNDLED_FONT):
+        return BUNDLED_FONT
+    return os.path.join(os.path.dirname(pygame.__file__), pygame.font.get_default_font())
+
+
+# Blank surfaces with the sprite sizes, enough for a Round to run without a display
+def hitbox_images():
+    return {kind: pygame.Surface(size) for kind, size in SPRITE_SIZES.items()}
 
 
 class Player(pygame.sprite.Sprite):
@@ -48,9 +116,9 @@ class Player(pygame.sprite.Sprite):
         self.boosting = False
 
     def update(self, keys):
-        speed = 5
+        speed = PLAYER_SPEED
         if keys[pygame.K_UP]:
-            speed = 9
+            speed = PLAYER_BOOST_SPEED
             self.boosting = True
         else:
             self.boosting = False
@@ -61,12 +129,13 @@ class Player(pygame.sprite.Sprite):
 
 
 class Enemy(pygame.sprite.Sprite):
-    def __init__(self, image, speed):
+    def __init__(self, image, speed, x, kind="enemy"):
         super().__init__()
         self.image = image
+        self.kind = kind
         self.rect = self.image.get_rect()
         self.rect.inflate_ip(-55, -20)
-        self.rect.center = (random.randint(50, SCREEN_WIDTH - 50), -50)
+        self.rect.center = (x, -50)
         self.speed = speed
 
     def update(self):
@@ -76,12 +145,14 @@ class Enemy(pygame.sprite.Sprite):
 
 
 class SameDirectionEnemy(pygame.sprite.Sprite):
-    def __init__(self, image):
+    kind = "same_direction"
+
+    def __init__(self, image, x):
         super().__init__()
         self.image = image
         self.rect = self.image.get_rect()
         self.rect.inflate_ip(-55, -20)
-        self.rect.center = (random.randint(50, SCREEN_WIDTH - 50), -100)
+        self.rect.center = (x, -100)
 
     def update(self, speed):
         self.rect.move_ip(0, speed)
@@ -90,18 +161,117 @@ class SameDirectionEnemy(pygame.sprite.Sprite):
 
 
 class Coin(pygame.sprite.Sprite):
-    def __init__(self, image):
+    def __init__(self, image, x):
         super().__init__()
         self.image = image
         self.rect = self.image.get_rect()
-        self.rect.center = (random.randint(50, SCREEN_WIDTH - 50), -40)
+        self.rect.center = (x, -40)
 
     def update(self):
-        self.rect.move_ip(0, 5)
+        self.rect.move_ip(0, COIN_SPEED)
         if self.rect.top > SCREEN_HEIGHT:
             self.kill()
 
 
+# One round of play without any drawing, input or sound. Time is simulated
+# (one step is one frame at FPS) and all randomness comes from `rng`, so a
+# seeded round replays exactly, with or without a window.
+class Round:
+    def __init__(self, level, images, config=None, rng=None):
+        self.level = level
+        self.config = dict(LEVELS[level], **(config or {}))
+        self.images = images
+        self.rng = rng or random.Random()
+
+        self.player = Player(images["player"])
+        self.player_group = pygame.sprite.Group(self.player)
+        self.enemies = pygame.sprite.Group()
+        self.same_direction_enemies = pygame.sprite.Group()
+        self.coins = pygame.sprite.Group()
+
+        self.frame = 0
+        self.time = 0.0
+        self.street_y = 0
+        self.street_speed = self.config["base_speed"]
+        self.score = 0
+        self.start_time = None
+        self.enemy_timer = 0.0
+        self.same_dir_timer = 0.0
+        self.coin_timer = 0.0
+        self.finishing = False
+        self.finishing_line_y = -30
+        # "crash" or "complete" once the round is over
+        self.outcome = None
+        self.crash_cause = None
+
+    def spawn_x(self):
+        return self.rng.randint(50, SCREEN_WIDTH - 50)
+
+    def spawn(self):
+        config = self.config
+        if self.time - self.coin_timer >= config["coin_interval"]:
+            self.coins.add(Coin(self.images["coin"], self.spawn_x()))
+            self.coin_timer = self.time
+
+        if self.time - self.enemy_timer >= config["enemy_interval"]:
+            if config["enemy_kinds"]:
+                for _ in range(self.rng.randint(*config["burst"])):
+                    kind = self.rng.choice(config["enemy_kinds"])
+                    speed = self.street_speed if config["match_street_speed"] else config["base_speed"]
+                    speed += self.rng.randint(*config["speed_jitter"])
+                    self.enemies.add(Enemy(self.images[kind], speed, self.spawn_x(), kind))
+            self.enemy_timer = self.time
+
+        if self.time - self.same_dir_timer >= config["same_dir_interval"]:
+            self.same_direction_enemies.add(SameDirectionEnemy(self.images["same_direction"], self.spawn_x()))
+            self.same_dir_timer = self.time
+
+    # Advances one frame and returns what happened as (event, sprite) pairs:
+    # "coin" for every coin picked up, then "crash" or "complete" when the round ends
+    def step(self, keys):
+        self.frame += 1
+        self.time = self.frame / FPS
+        config = self.config
+        boosting = keys[pygame.K_UP]
+
+        self.street_speed = config["base_speed"] + (config["boost_speed"] if boosting else 0)
+        self.street_y += self.street_speed
+        if self.street_y >= SCREEN_HEIGHT:
+            self.street_y = 0
+
+        self.spawn()
+        self.coins.update()
+        self.enemies.update()
+        for e in self.same_direction_enemies:
+            e.update(config["base_speed"])
+        self.player.update(keys)
+
+        events = []
+        for coin in pygame.sprite.spritecollide(self.player, self.coins, True):
+            self.score += 1
+            events.append(("coin", coin))
+
+        hit = (pygame.sprite.spritecollideany(self.player, self.enemies)
+               or pygame.sprite.spritecollideany(self.player, self.same_direction_enemies))
+        if hit:
+            self.outcome = "crash"
+            self.crash_cause = hit.kind
+            events.append(("crash", hit))
+            return events
+
+        if self.start_time is None and boosting:
+            self.start_time = self.time
+
+        if self.start_time is not None and self.time - self.start_time >= config["finish_time"]:
+            self.finishing = True
+            if self.finishing_line_y < self.player.rect.top:
+                self.finishing_line_y += 2
+            else:
+                self.outcome = "complete"
+                events.append(("complete", None))
+        return events
+
+
 class Button:
     def __init__(self, image, x, y, width=200, height=50):
         self.image = image
@@ -115,51 +285,90 @@ class Button:
 
 
 class Game:
-    def __init__(self):
-        # Set up display and clock
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    def __init__(self, renderer, profile=False, startup=None):
+        # The renderer owns the display. Everything is drawn through it in
+        # SCREEN_WIDTH x SCREEN_HEIGHT coordinates, whatever the backend or window size is.
+        self.renderer = renderer
+        self.profile = profile
+        self.profile_frames = 0
+        self.startup = startup or StartupProfiler()
         pygame.display.set_caption("Car Game")
 
         self.clock = pygame.time.Clock()
+        self.particles = ParticleSystem()
 
-        # Load assets
-        self.load_assets()
+        # Only what the start screen shows is loaded before the first frame
+        self.load_menu_assets()
+        # Opens the database and warms the leaderboards on its own thread
+        self.scores = ScoreStore()
+        self.startup.mark("scores")
 
         # Initialize game state variables
         self.selected_level = None
         self.message = ""
 
-    def load_assets(self):
-        # Images
-        self.background_img = load_image("background.png", SCREEN_WIDTH, SCREEN_HEIGHT)
-        self.cloud1_img = load_image("cloud.png", 200, 75)
-        self.cloud2_img = load_image("cloud2.png", 175, 65)
+    def load_menu_assets(self):
+        self.background_img = self.renderer.load_image("background.png", SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.cloud1_img = self.renderer.load_image("cloud.png", 200, 75)
+        self.cloud2_img = self.renderer.load_image("cloud2.png", 175, 65)
         self.level_btn_images = [
-            load_image("level1.png", 200, 50),
-            load_image("level2.png", 200, 50),
-            load_image("level3.png", 200, 50)
+            self.renderer.load_image("level1.png", 200, 50),
+            self.renderer.load_image("level2.png", 200, 50),
+            self.renderer.load_image("level3.png", 200, 50)
         ]
-        self.play_btn_img = load_image("play.png", 200, 50)
-        self.player_img = load_image("player2.png", 100, 120)
-        self.enemy_img = load_image("enemy4.png", 110, 125)
-        self.same_dir_enemy_img = load_image("Enemy8.png", 110, 125)
-        self.rock_img = load_image("Rock.png", 60, 70)
-        self.street_img = load_image("AnimatedStreet.png", SCREEN_WIDTH, SCREEN_HEIGHT)
-        self.finishing_line_img = load_image("FinishingLine.png", SCREEN_WIDTH, 30)
-        self.lose_img = load_image("game_over_background.png", SCREEN_WIDTH, SCREEN_HEIGHT)
-        self.win_img = load_image("you_win_background.png", SCREEN_WIDTH, SCREEN_HEIGHT)
-        self.coin_img = load_image("coin.png", 70, 70)
-
-        # Sounds
-        self.click_sound = load_sound("click.wav")
-        self.background_music_path = "background.wav"
-        self.victory_sound = load_sound("victory.wav")
-        self.collision_sound = load_sound("crash.wav")
-        self.coin_sound = load_sound("coin_collect.wav")
+        self.play_btn_img = self.renderer.load_image("play.png", 200, 50)
+        self.startup.mark("menu images")
 
         # Fonts
-        self.font = pygame.font.SysFont("Arial", 30)
-        self.large_font = pygame.font.SysFont("Arial", 40)
+        self.font = pygame.font.Font(font_path(), 30)
+        self.large_font = pygame.font.Font(font_path(), 40)
+        self.small_font = pygame.font.Font(font_path(), 22)
+        self.startup.mark("fonts")
+
+    def load_game_assets(self):
+        # Images
+        self.player_img = self.renderer.load_image("player2.png", *SPRITE_SIZES["player"])
+        self.enemy_img = self.renderer.load_image("enemy4.png", *SPRITE_SIZES["enemy"])
+        self.same_dir_enemy_img = self.renderer.load_image("Enemy8.png", *SPRITE_SIZES["same_direction"])
+        self.rock_img = self.renderer.load_image("Rock.png", *SPRITE_SIZES["rock"])
+        self.street_img = self.renderer.load_image("AnimatedStreet.png", SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.finishing_line_img = self.renderer.load_image("FinishingLine.png", SCREEN_WIDTH, 30)
+        self.lose_img = self.renderer.load_image("game_over_background.png", SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.win_img = self.renderer.load_image("you_win_background.png", SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.coin_img = self.renderer.load_image("coin.png", *SPRITE_SIZES["coin"])
+        self.sprite_images = {
+            "player": self.player_img,
+            "enemy": self.enemy_img,
+            "same_direction": self.same_dir_enemy_img,
+            "slow_car": self.same_dir_enemy_img,
+            "rock": self.rock_img,
+            "coin": self.coin_img,
+        }
+        self.startup.mark("game images")
+
+        # Sounds
+        self.audio = AudioEngine({
+            "click": ("click.wav", "ui"),
+            "victory": ("victory.wav", "victory"),
+            "crash": ("crash.wav", "crash"),
+            "coin": ("coin_collect.wav", "coin"),
+        }, "background.wav")
+        self.startup.mark("audio")
+
+    def tick(self):
+        self.clock.tick(FPS)
+        # Raw time is the work done last frame, without the sleep added by tick
+        self.renderer.adjust(self.clock.get_rawtime())
+        if self.profile:
+            self.print_profile()
+
+    def print_profile(self):
+        # One line per second: last frame's work time plus the renderer's counters
+        self.profile_frames += 1
+        if self.profile_frames % FPS:
+            return
+        stats = " ".join(f"{name}={value}" for name, value in self.renderer.frame_stats().items())
+        print(f"[{self.renderer.name}] frame {self.clock.get_rawtime()} ms, {self.clock.get_fps():.1f} fps {stats}".rstrip())
 
     def start_screen(self):
         cloud1_x = SCREEN_WIDTH
@@ -181,9 +390,17 @@ class Game:
             Button(self.play_btn_img, x_pos, y_positions[3]),
         ]
 
+        self.renderer.enter_scene()
+        idle_frames = 0
         running = True
         while running:
-            self.screen.blit(self.background_img, (0, 0))
+            idle_frames += 1
+            if idle_frames >= ATTRACT_AFTER * FPS:
+                self.attract_mode()
+                self.renderer.enter_scene()
+                idle_frames = 0
+
+            self.renderer.blit(self.background_img, (0, 0))
 
             cloud1_x -= 1
             if cloud1_x < -self.cloud1_img.get_width():
@@ -192,31 +409,43 @@ class Game:
             if cloud2_x > SCREEN_WIDTH:
                 cloud2_x = -self.cloud2_img.get_width()
 
-            self.screen.blit(self.cloud1_img, (cloud1_x, cloud1_y))
-            self.screen.blit(self.cloud2_img, (cloud2_x, cloud2_y))
+            self.renderer.blit(self.cloud1_img, (cloud1_x, cloud1_y))
+            self.renderer.blit(self.cloud2_img, (cloud2_x, cloud2_y))
 
             for btn in buttons:
-                btn.draw(self.screen)
+                btn.draw(self.renderer)
+
+            # Served from the score store's memory, the menu never waits on the database
+            for level in LEVELS:
+                best = "  ".join(str(score) for score in self.scores.leaderboard(level)[:3]) or "-"
+                best_text = self.renderer.text(self.small_font, f"Level {level} best: {best}", BLACK)
+                self.renderer.blit(best_text, (20, 20 + (level - 1) * 26))
 
             if self.message:
-                text_surface = self.font.render(self.message, True, BLACK)
-                self.screen.blit(text_surface, (20, 500))
+                text_surface = self.renderer.text(self.font, self.message, BLACK)
+                self.renderer.blit(text_surface, (20, 500))
 
-            pygame.display.flip()
+            self.renderer.present()
+            if self.startup:
+                # The menu is up, load everything else before handling input
+                self.startup.mark_first_frame()
+                self.load_game_assets()
+                self.startup.report()
+                self.startup = None
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    mx, my = event.pos
+                    self.quit()
+                if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                    idle_frames = 0
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    mx, my = self.renderer.to_logical(event.pos)
                     for i, btn in enumerate(buttons):
                         if btn.is_clicked((mx, my)):
                             if i < 3:
                                 self.selected_level = i + 1
                                 self.message = f"Level {self.selected_level} selected"
-                                if self.click_sound:
-                                    self.click_sound.play()
+                                self.audio.play("click")
                             else:
                                 if self.selected_level is None:
                                     self.message = "Choose level first"
@@ -226,177 +455,169 @@ class Game:
                                     self.message = ""
                             break
 
-            self.clock.tick(FPS)
+            self.tick()
 
     def pause_screen(self):
-        pygame.mixer.music.pause()
+        self.audio.pause_music()
+        self.renderer.enter_scene()
         paused = True
         while paused:
-            self.screen.fill(BLACK)
-            pause_text = self.large_font.render("Paused", True, WHITE)
-            resume_text = self.font.render("Press ESC to Resume", True, WHITE)
-            self.screen.blit(pause_text, (SCREEN_WIDTH // 2 - pause_text.get_width() // 2, SCREEN_HEIGHT // 3))
-            self.screen.blit(resume_text, (SCREEN_WIDTH // 2 - resume_text.get_width() // 2, SCREEN_HEIGHT // 2))
-            pygame.display.flip()
+            self.renderer.fill(BLACK)
+            pause_text = self.renderer.text(self.large_font, "Paused", WHITE)
+            resume_text = self.renderer.text(self.font, "Press ESC to Resume", WHITE)
+            self.renderer.blit(pause_text, (SCREEN_WIDTH // 2 - pause_text.get_width() // 2, SCREEN_HEIGHT // 3))
+            self.renderer.blit(resume_text, (SCREEN_WIDTH // 2 - resume_text.get_width() // 2, SCREEN_HEIGHT // 2))
+            self.renderer.present()
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
                 elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                     paused = False
-                    pygame.mixer.music.unpause()
-
-            self.clock.tick(FPS)
-
-    def check_collision(self, player, enemies):
-        return pygame.sprite.spritecollideany(player, enemies) is not None
-
-    def game_loop(self, level):
-        player = Player(self.player_img)
-        player_group = pygame.sprite.Group(player)
-        enemies = pygame.sprite.Group()
-        same_direction_enemies = pygame.sprite.Group()
-        coins = pygame.sprite.Group()
-
-        street_y = 0
-        base_speed = 5
-        score = 0
-        start_time = None
-        enemy_timer = time.time()
-        same_dir_timer = time.time()
-        coin_timer = time.time()
-        finishing_line_y = -30
-        finishing_line_reached = False
-
-        if self.background_music_path:
-            pygame.mixer.music.load(self.background_music_path)
-            pygame.mixer.music.play(-1, 0.0)
+                    self.audio.unpause_music()
+
+            self.tick()
+
+    def attract_mode(self):
+        self.game_loop(3, autopilot=Autopilot())
+
+    # With an autopilot the round is a demo: it drives instead of the keyboard,
+    # any key or click ends it, and it neither plays music nor records a score
+    def game_loop(self, level, autopilot=None):
+        race = Round(level, self.sprite_images)
+        self.particles.clear()
+        self.renderer.enter_scene()
+
+        if not autopilot:
+            self.audio.play_music()
 
         running = True
         while running:
-            self.screen.fill(WHITE)
-            keys = pygame.key.get_pressed()
-
-            street_speed = base_speed + (4 if keys[pygame.K_UP] else 0)
-
-            street_y += street_speed
-            if street_y >= SCREEN_HEIGHT:
-                street_y = 0
-
-            self.screen.blit(self.street_img, (0, street_y))
-            self.screen.blit(self.street_img, (0, street_y - SCREEN_HEIGHT))
-
-            now = time.time()
-
-            if now - coin_timer >= 2:
-                coins.add(Coin(self.coin_img))
-                coin_timer = now
-
-            if now - enemy_timer >= 3:
-                if level == 1:
-                    pass
-                elif level == 2:
-                    img = random.choice([self.same_dir_enemy_img, self.rock_img])
-                    enemies.add(Enemy(img, base_speed))
-                elif level == 3:
-                    for _ in range(random.randint(2, 4)):
-                        img = random.choice([self.enemy_img, self.rock_img])
-                        speed = street_speed + random.randint(0, 3)
-                        enemies.add(Enemy(img, speed))
-                enemy_timer = now
-
-            if level >= 1 and now - same_dir_timer >= 5:
-                same_direction_enemies.add(SameDirectionEnemy(self.same_dir_enemy_img))
-                same_dir_timer = now
-
-            coins.update()
-            enemies.update()
-            for e in same_direction_enemies:
-                e.update(base_speed)
-
-            coins.draw(self.screen)
-            enemies.draw(self.screen)
-            same_direction_enemies.draw(self.screen)
-
-            player.update(keys)
-            player_group.draw(self.screen)
-
-            # Coin collisions
-            coin_collisions = pygame.sprite.spritecollide(player, coins, True)
-            for _ in coin_collisions:
-                score += 1
-                if self.coin_sound:
-                    self.coin_sound.play()
-
-            score_text = self.font.render(f"Score: {score}", True, BLACK)
-            self.screen.blit(score_text, (10, 17))
-
-            # Enemy collisions
-            if self.check_collision(player, enemies) or self.check_collision(player, same_direction_enemies):
-                if self.collision_sound:
-                    self.collision_sound.play()
-                pygame.mixer.music.stop()
-                return self.game_over_screen()
-
-            if start_time is None and keys[pygame.K_UP]:
-                start_time = time.time()
-
-            if start_time and now - start_time >= 60:
-                if finishing_line_y < player.rect.top:
-                    finishing_line_y += 2
-                else:
-                    finishing_line_reached = True
-                self.screen.blit(self.finishing_line_img, (0, finishing_line_y))
-                if finishing_line_reached:
-                    if self.victory_sound:
-                        self.victory_sound.play()
-                    pygame.mixer.music.stop()
+            keys = autopilot(race) if autopilot else pygame.key.get_pressed()
+            events = race.step(keys)
+
+            self.renderer.fill(WHITE)
+            self.renderer.blit(self.street_img, (0, race.street_y))
+            self.renderer.blit(self.street_img, (0, race.street_y - SCREEN_HEIGHT))
+
+            self.renderer.draw_group(race.coins)
+            self.renderer.draw_group(race.enemies)
+            self.renderer.draw_group(race.same_direction_enemies)
+
+            player = race.player
+            if player.boosting:
+                self.particles.burst(player.rect.centerx, player.rect.bottom, BOOST,
+                                     direction=math.pi / 2, spread=0.6)
+            self.particles.update()
+            self.renderer.draw_particles(self.particles)
+            self.renderer.draw_group(race.player_group)
+
+            score_text = self.renderer.text(self.font, f"Score: {race.score}", BLACK)
+            self.renderer.blit(score_text, (10, 17))
+            if race.finishing:
+                self.renderer.blit(self.finishing_line_img, (0, race.finishing_line_y))
+
+            if autopilot:
+                demo_text = self.renderer.text(self.small_font, "Demo - press any key", BLACK)
+                self.renderer.blit(demo_text, (10, SCREEN_HEIGHT - 35))
+                if race.outcome:
+                    return
+            elif race.outcome:
+                self.scores.record(level, race.score, race.time, race.outcome, race.crash_cause)
+
+            for event, sprite in events:
+                if event == "coin":
+                    self.particles.burst(sprite.rect.centerx, sprite.rect.centery, COIN)
+                    self.audio.play("coin")
+                elif event == "crash":
+                    self.audio.play("crash")
+                    self.audio.stop_music()
+                    self.particles.burst(player.rect.centerx, player.rect.top, CRASH)
+                    return self.game_over_screen()
+                elif event == "complete":
+                    self.audio.play("victory")
+                    self.audio.stop_music()
                     return self.level_complete_screen(level)
 
-            pygame.display.flip()
+            self.renderer.present()
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
+                elif autopilot and event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+                    return
                 elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                     self.pause_screen()
+                    self.renderer.enter_scene()
 
-            self.clock.tick(FPS)
+            self.tick()
 
     def game_over_screen(self):
+        self.renderer.enter_scene()
         while True:
-            self.screen.blit(self.lose_img, (0, 0))
-            text2 = self.large_font.render("Press SPACE to return to Start", True, WHITE)
-            self.screen.blit(text2, (SCREEN_WIDTH // 2 - text2.get_width() // 2, SCREEN_HEIGHT // 2 + 100))
-            pygame.display.flip()
+            self.renderer.blit(self.lose_img, (0, 0))
+            # Let the crash burst play out over the game over screen
+            self.particles.update()
+            self.renderer.draw_particles(self.particles)
+            text2 = self.renderer.text(self.large_font, "Press SPACE to return to Start", WHITE)
+            self.renderer.blit(text2, (SCREEN_WIDTH // 2 - text2.get_width() // 2, SCREEN_HEIGHT // 2 + 100))
+            self.renderer.present()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
                 elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                     return self.start_screen()
-            self.clock.tick(FPS)
+            self.tick()
 
     def level_complete_screen(self, level):
+        self.renderer.enter_scene()
         while True:
-            self.screen.blit(self.win_img, (0, 0))
-            text2 = self.large_font.render("Press SPACE to return to Start", True, WHITE)
-            self.screen.blit(text2, (SCREEN_WIDTH // 2 - text2.get_width() // 2, SCREEN_HEIGHT // 2 + 120))
-            pygame.display.flip()
+            self.renderer.blit(self.win_img, (0, 0))
+            text2 = self.renderer.text(self.large_font, "Press SPACE to return to Start", WHITE)
+            self.renderer.blit(text2, (SCREEN_WIDTH // 2 - text2.get_width() // 2, SCREEN_HEIGHT // 2 + 120))
+            self.renderer.present()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
+                    self.quit()
                 elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                     return self.start_screen()
-            self.clock.tick(FPS)
+            self.tick()
 
     def run(self):
         self.start_screen()
 
+    def quit(self):
+        self.renderer.close()
+        pygame.quit()
+        sys.exit()
+
+
+# Value given after a command line flag, `default` if the flag or its value is missing
+def argument(name, default=None):
+    if name not in sys.argv:
+        return default
+    index = sys.argv.index(name) + 1
+    if index == len(sys.argv) or sys.argv[index].startswith("--"):
+        return default
+    return sys.argv[index]
+
 
 if __name__ == "__main__":
-    game = Game()
+    startup = StartupProfiler(STARTED, "--profile-startup" in sys.argv)
+    startup.mark("imports")
+    init()
+    startup.mark("init")
+    window_size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+    if "--size" in sys.argv:
+        try:
+            width, height = argument("--size", "").split("x")
+            window_size = (int(width), int(height))
+        except ValueError:
+            sys.exit("--size must be WIDTHxHEIGHT, e.g. --size 1000x1200")
+    choice = argument("--renderer", "" if "--renderer" in sys.argv else "auto")
+    if choice not in RENDERERS:
+        sys.exit(f"--renderer must be one of: {', '.join(RENDERERS)}")
+    renderer = select_renderer(window_size, (SCREEN_WIDTH, SCREEN_HEIGHT), FPS, choice)
+    startup.mark(f"renderer ({renderer.name})")
+    game = Game(renderer, profile="--profile" in sys.argv, startup=startup)
     game.run()
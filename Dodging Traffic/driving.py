@@ -0,0 +1,21 @@
+import pygame
+
+# Screen dimensions
+SCREEN_WIDTH = 500
+SCREEN_HEIGHT = 600
+
+# Pixels per frame. The game moves its sprites by these and the autopilot
+# predicts with them, so they live here and not in the game script.
+PLAYER_SPEED = 5
+# Sideways while boosting, not the extra street speed of LEVELS[...]["boost_speed"]
+PLAYER_BOOST_SPEED = 9
+COIN_SPEED = 5
+
+
+# Stand-in for pygame.key.get_pressed() when something other than the keyboard drives the player
+class KeyState:
+    def __init__(self, left=False, right=False, up=False):
+        self.pressed = {pygame.K_LEFT: left, pygame.K_RIGHT: right, pygame.K_UP: up}
+
+    def __getitem__(self, key):
+        return self.pressed.get(key, False)
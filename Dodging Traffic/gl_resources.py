@@ -0,0 +1,127 @@
+import pygame
+from OpenGL.GL import *
+
+COUNTERS = ("draw_calls", "binds", "uploads", "upload_bytes")
+
+
+# Texture handle that answers the same size queries as a pygame.Surface,
+# so sprites can build their rects from it
+class Texture:
+    def __init__(self, tex_id, width, height):
+        self.id = tex_id
+        self.width = width
+        self.height = height
+
+    def get_width(self):
+        return self.width
+
+    def get_height(self):
+        return self.height
+
+    def get_size(self):
+        return self.width, self.height
+
+    def get_rect(self, **kwargs):
+        rect = pygame.Rect(0, 0, self.width, self.height)
+        for key, value in kwargs.items():
+            setattr(rect, key, value)
+        return rect
+
+
+# Owns every texture and buffer the GL renderer creates. Resources are shared by
+# key and reference counted; the ones acquired for a scene are released when the
+# next scene starts. Also caches the bound texture and counts GL work per frame.
+class GLResources:
+    def __init__(self):
+        self.entries = {}  # key -> [kind, resource, refs]
+        self.scene_keys = set()
+        self.anonymous = 0
+        self.bound_texture = None
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.last_frame = dict(self.counters)
+
+    def texture(self, key, make_surface, scene=False):
+        if scene and key in self.scene_keys:
+            return self.entries[key][1]
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = ["texture", self.create_texture(make_surface()), 0]
+        entry[2] += 1
+        if scene:
+            self.scene_keys.add(key)
+        return entry[1]
+
+    def upload(self, surface):
+        # Resources nobody will look up again still get a key so they can be released
+        self.anonymous += 1
+        key = ("anonymous", self.anonymous)
+        return key, self.texture(key, lambda: surface)
+
+    # Drops one reference, like release(), for callers that only kept the Texture
+    def release_texture(self, texture):
+        for key, entry in self.entries.items():
+            if entry[0] == "texture" and entry[1] is texture:
+                return self.release(key)
+
+    def buffer(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = ["buffer", glGenBuffers(1), 0]
+        entry[2] += 1
+        return entry[1]
+
+    def release(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        entry[2] -= 1
+        if entry[2] > 0:
+            return
+        kind, resource, _ = self.entries.pop(key)
+        if kind == "texture":
+            glDeleteTextures([resource.id])
+            if self.bound_texture == resource.id:
+                self.bound_texture = None
+        else:
+            glDeleteBuffers(1, [resource])
+
+    def enter_scene(self):
+        for key in self.scene_keys:
+            self.release(key)
+        self.scene_keys = set()
+
+    def release_all(self):
+        for key in list(self.entries):
+            self.entries[key][2] = 1
+            self.release(key)
+        self.scene_keys = set()
+
+    def create_texture(self, surface):
+        data = pygame.image.tobytes(surface, "RGBA", True)
+        tex_id = glGenTextures(1)
+        self.bind_texture(tex_id)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, surface.get_width(), surface.get_height(),
+                     0, GL_RGBA, GL_UNSIGNED_BYTE, data)
+        self.counters["uploads"] += 1
+        self.counters["upload_bytes"] += len(data)
+        return Texture(tex_id, surface.get_width(), surface.get_height())
+
+    def bind_texture(self, tex_id):
+        if tex_id == self.bound_texture:
+            return
+        glBindTexture(GL_TEXTURE_2D, tex_id)
+        self.bound_texture = tex_id
+        self.counters["binds"] += 1
+
+    def upload_buffer(self, buffer_id, data):
+        glBindBuffer(GL_ARRAY_BUFFER, buffer_id)
+        # Orphan the old storage so the driver never stalls on last frame's draw
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STREAM_DRAW)
+        self.counters["uploads"] += 1
+        self.counters["upload_bytes"] += data.nbytes
+
+    def end_frame(self):
+        self.last_frame = self.counters
+        self.counters = dict.fromkeys(COUNTERS, 0)
@@ -0,0 +1,118 @@
+import numpy as np
+import pygame
+
+# Hard cap on live particles, new bursts are dropped once it is reached
+MAX_PARTICLES = 8192
+
+# Preset bursts: (count, colors, speed range, life range in frames, gravity)
+CRASH = (400, [(255, 90, 0), (255, 200, 40), (90, 90, 90)], (2.0, 9.0), (20, 60), 0.15)
+COIN = (40, [(255, 220, 0), (255, 255, 160)], (1.0, 4.0), (15, 35), 0.0)
+BOOST = (6, [(200, 200, 255), (255, 255, 255)], (0.5, 2.0), (10, 25), 0.0)
+
+
+class ParticleSystem:
+    def __init__(self, capacity=MAX_PARTICLES, size=3):
+        self.capacity = capacity
+        self.size = size
+        self.count = 0
+        # Particle state lives in flat arrays so update and draw are batch operations
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.max_life = np.ones(capacity, dtype=np.float32)
+        self.gravity = np.zeros(capacity, dtype=np.float32)
+        self.color = np.zeros((capacity, 3), dtype=np.uint8)
+        self.dots = {}
+
+    def clear(self):
+        self.count = 0
+
+    def emit(self, x, y, count, colors, speed=(1.0, 4.0), life=(20, 40), gravity=0.0,
+             direction=None, spread=np.pi * 2):
+        count = min(count, self.capacity - self.count)
+        if count <= 0:
+            return
+        start, end = self.count, self.count + count
+
+        # Random directions within `spread` of `direction`, which defaults to straight up;
+        # the default spread is the full circle, so the direction only matters with a narrower one
+        base = -np.pi / 2 if direction is None else direction
+        angles = base + (np.random.random(count) - 0.5) * spread
+        speeds = np.random.uniform(speed[0], speed[1], count)
+        self.pos[start:end] = (x, y)
+        self.vel[start:end, 0] = np.cos(angles) * speeds
+        self.vel[start:end, 1] = np.sin(angles) * speeds
+        lives = np.random.uniform(life[0], life[1], count)
+        self.life[start:end] = lives
+        self.max_life[start:end] = lives
+        self.gravity[start:end] = gravity
+        palette = np.array(colors, dtype=np.uint8)
+        self.color[start:end] = palette[np.random.randint(len(palette), size=count)]
+        self.count = end
+
+    def burst(self, x, y, preset, **kwargs):
+        count, colors, speed, life, gravity = preset
+        self.emit(x, y, count, colors, speed, life, gravity, **kwargs)
+
+    def update(self):
+        n = self.count
+        if not n:
+            return
+        self.vel[:n, 1] += self.gravity[:n]
+        self.pos[:n] += self.vel[:n]
+        self.life[:n] -= 1
+
+        # Cull dead particles by compacting the live ones to the front
+        alive = self.life[:n] > 0
+        live = int(np.count_nonzero(alive))
+        if live != n:
+            for arr in (self.pos, self.vel, self.life, self.max_life, self.gravity, self.color):
+                arr[:live] = arr[:n][alive]
+            self.count = live
+
+    def faded_colors(self):
+        n = self.count
+        fade = (self.life[:n] / self.max_life[:n])[:, None]
+        return (self.color[:n] * (0.35 + 0.65 * fade)).astype(np.uint8)
+
+    def draw(self, surface, scale=1.0):
+        n = self.count
+        if not n:
+            return
+        size = max(1, int(round(self.size * scale)))
+        width, height = surface.get_size()
+        xy = (self.pos[:n] * scale).astype(np.int32)
+        inside = (xy[:, 0] >= 0) & (xy[:, 0] <= width - size) & (xy[:, 1] >= 0) & (xy[:, 1] <= height - size)
+        xs, ys = xy[inside, 0], xy[inside, 1]
+        colors = self.faded_colors()[inside]
+
+        try:
+            pixels = pygame.surfarray.pixels3d(surface)
+        except (ValueError, pygame.error):
+            # Surfaces that can't be referenced directly (e.g. 8/16 bit) fall back to batched blits
+            return self.blit_dots(surface, xs, ys, colors, size)
+        try:
+            for dx in range(size):
+                for dy in range(size):
+                    pixels[xs + dx, ys + dy] = colors
+        finally:
+            del pixels
+
+    def blit_dots(self, surface, xs, ys, colors, size):
+        # Colors are quantized so the number of cached dot surfaces stays small
+        keys = (colors >> 5).astype(np.int32)
+        keys = (keys[:, 0] << 6) | (keys[:, 1] << 3) | keys[:, 2]
+        blits = []
+        for key, x, y in zip(keys.tolist(), xs.tolist(), ys.tolist()):
+            dot = self.dots.get((key, size))
+            if dot is None:
+                rgb = (((key >> 6) & 7) << 5, ((key >> 3) & 7) << 5, (key & 7) << 5)
+                dot = pygame.Surface((size, size))
+                dot.fill(rgb)
+                self.dots[(key, size)] = dot
+            blits.append((dot, (x, y)))
+        fblits = getattr(surface, "fblits", None)
+        if fblits:
+            fblits(blits)
+        else:
+            surface.blits(blits, doreturn=False)
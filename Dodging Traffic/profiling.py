@@ -0,0 +1,39 @@
+import time
+
+
+# Collects how long each startup stage took. The total runs from `started` up to
+# the first presented frame; stages marked after it are listed on their own.
+# Marks are always recorded; report() only prints when enabled.
+class StartupProfiler:
+    def __init__(self, started=None, enabled=False):
+        self.started = time.perf_counter() if started is None else started
+        self.last = self.started
+        self.enabled = enabled
+        self.stages = []
+        self.first_frame = None  # Number of stages up to and including the first frame
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.stages.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def mark_first_frame(self):
+        self.mark("first frame")
+        self.first_frame = len(self.stages)
+
+    def report(self):
+        if not self.enabled:
+            return
+        before = self.stages[:self.first_frame]
+        after = self.stages[len(before):]
+        total = sum(ms for _, ms in before)
+        width = max(len(name) for name, _ in self.stages)
+        print("Startup profile:")
+        for name, ms in before:
+            print(f"  {name:<{width}}  {ms:7.1f} ms  {ms / total * 100:5.1f}%")
+        print(f"  {'total':<{width}}  {total:7.1f} ms")
+        if after:
+            print("After first frame:")
+            for name, ms in after:
+                print(f"  {name:<{width}}  {ms:7.1f} ms")
+            print(f"  {'total':<{width}}  {sum(ms for _, ms in after):7.1f} ms")
@@ -0,0 +1,229 @@
+import json
+import os
+import random
+import time
+
+import pygame
+
+from resolution import Viewport
+
+# "auto" benchmarks once per video driver and window size and then reuses the
+# answer, "benchmark" always measures again
+RENDERERS = ("auto", "benchmark", "software", "gl")
+BACKENDS = ("software", "gl")
+
+# Scaled copies of the source images and the renderer choice are kept here
+CACHE_DIR = ".cache"
+RENDERER_CACHE = os.path.join(CACHE_DIR, "renderer.json")
+
+
+def cached_asset_path(path, width, height):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{name}_{width}x{height}.rgba")
+
+
+def read_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def write_cache(path, data):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+    except OSError as e:
+        print(f"Could not write cache: {path}. {e}")
+
+
+# Interface the game core draws through. Every position is a logical top-left
+# coordinate with y pointing down, whatever the backend does underneath.
+class Renderer:
+    name = None
+
+    def upload(self, surface):
+        raise NotImplementedError
+
+    def blit(self, image, pos):
+        raise NotImplementedError
+
+    def fill(self, color):
+        raise NotImplementedError
+
+    def draw_particles(self, system):
+        raise NotImplementedError
+
+    def present(self):
+        raise NotImplementedError
+
+    # Work present() does before the buffer swap
+    def compose(self):
+        pass
+
+    def adjust(self, frame_ms):
+        pass
+
+    def finish(self):
+        pass
+
+    # Frees what upload() made for an image nobody draws anymore
+    def release(self, image):
+        pass
+
+    # Frees everything the renderer still holds, before the display goes away
+    def close(self):
+        pass
+
+    # Resources acquired for the previous screen may be dropped from here on
+    def enter_scene(self):
+        pass
+
+    # Counters for the last presented frame, shown by --profile
+    def frame_stats(self):
+        return {}
+
+    def load_surface(self, path, width=None, height=None):
+        try:
+            # The source images are far larger than they are drawn, decoding them is
+            # most of the startup time. The scaled pixels are saved raw and reused.
+            cached = cached_asset_path(path, width, height) if width and height else None
+            if cached and os.path.exists(cached) and os.path.getmtime(cached) >= os.path.getmtime(path):
+                try:
+                    with open(cached, "rb") as f:
+                        return pygame.image.frombytes(f.read(), (width, height), "RGBA").convert_alpha()
+                except (OSError, ValueError) as e:
+                    # Truncated or corrupt, decode the source again and rewrite it
+                    print(f"Discarding image cache: {cached}. {e}")
+                    remove_file(cached)
+            image = pygame.image.load(path).convert_alpha()
+            if cached:
+                image = pygame.transform.scale(image, (width, height))
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    # Written aside and renamed, so a crash never leaves half a file behind
+                    with open(cached + ".tmp", "wb") as f:
+                        f.write(pygame.image.tobytes(image, "RGBA"))
+                    os.replace(cached + ".tmp", cached)
+                except OSError as e:
+                    print(f"Could not cache image: {cached}. {e}")
+                    remove_file(cached + ".tmp")
+            return image
+        except Exception as e:
+            print(f"Error loading image: {path}. {e}")
+            return pygame.Surface((width or 50, height or 50))
+
+    def load_image(self, path, width=None, height=None):
+        return self.upload(self.load_surface(path, width, height))
+
+    def text(self, font, text, color):
+        return font.render(text, True, color)
+
+    def draw_group(self, group):
+        # Same placement as pygame.sprite.Group.draw
+        for sprite in group:
+            self.blit(sprite.image, sprite.rect.topleft)
+
+    def to_logical(self, pos):
+        x = (pos[0] - self.target.x) * self.logical_width / max(1, self.target.width)
+        y = (pos[1] - self.target.y) * self.logical_height / max(1, self.target.height)
+        return int(x), int(y)
+
+    def benchmark(self, frames=30, warmup=5):
+        # Roughly a busy level 3 frame: scrolling street plus a screen full of cars
+        street = pygame.Surface((self.logical_width, self.logical_height)).convert()
+        street.fill((90, 90, 90))
+        car = pygame.Surface((110, 125), pygame.SRCALPHA)
+        car.fill((200, 30, 30, 200))
+        street, car = self.upload(street), self.upload(car)
+        rng = random.Random(0)
+        positions = [(rng.randint(0, self.logical_width - 110), rng.randint(0, self.logical_height - 125))
+                     for _ in range(24)]
+
+        # No flip: a GL swap waits for vsync and would hide the real render cost.
+        # finish() waits for the GPU instead, and the first frames only warm up.
+        for frame in range(warmup + frames):
+            if frame == warmup:
+                start = time.perf_counter()
+            self.fill((255, 255, 255))
+            self.blit(street, (0, frame))
+            self.blit(street, (0, frame - self.logical_height))
+            for pos in positions:
+                self.blit(car, pos)
+            self.compose()
+            self.finish()
+            pygame.event.pump()
+        elapsed = time.perf_counter() - start
+        self.release(street)
+        self.release(car)
+        return elapsed * 1000 / frames
+
+
+class SoftwareRenderer(Viewport, Renderer):
+    name = "software"
+
+    def __init__(self, window_size, logical_size, fps):
+        window = pygame.display.set_mode(window_size, pygame.RESIZABLE)
+        Viewport.__init__(self, window, logical_size, fps)
+
+    def upload(self, surface):
+        return surface
+
+    def draw_particles(self, system):
+        system.draw(self.surface, self.scale)
+
+
+def create_renderer(name, window_size, logical_size, fps):
+    if name == "gl":
+        # Deferred so the software path never pays for importing PyOpenGL
+        from test import GLRenderer
+        return GLRenderer(window_size, logical_size, fps)
+    return SoftwareRenderer(window_size, logical_size, fps)
+
+
+def select_renderer(window_size, logical_size, fps, choice="auto"):
+    cache = read_cache(RENDERER_CACHE)
+    key = f"{pygame.display.get_driver()} {window_size[0]}x{window_size[1]}"
+    if choice in BACKENDS:
+        return create_renderer(choice, window_size, logical_size, fps)
+    if choice == "auto" and key in cache:
+        try:
+            return create_renderer(cache[key], window_size, logical_size, fps)
+        except Exception as e:
+            # The backend worked when it was benchmarked (driver or PyOpenGL since gone), measure again
+            print(f"Renderer {cache[key]} unavailable, benchmarking again. {e}")
+            del cache[key]
+
+    # Time the same frame on every available backend and keep the fastest
+    timings = {}
+    renderer = None
+    for name in BACKENDS:
+        if renderer is not None:
+            renderer.close()
+        try:
+            renderer = create_renderer(name, window_size, logical_size, fps)
+            timings[name] = renderer.benchmark()
+        except Exception as e:
+            print(f"Renderer {name} unavailable. {e}")
+            renderer = None
+    if not timings:
+        raise RuntimeError("No renderer available")
+    best = min(timings, key=timings.get)
+    print("Renderer benchmark: " + ", ".join(f"{name} {ms:.2f} ms" for name, ms in timings.items())
+          + f" -> {best}")
+    cache[key] = best
+    write_cache(RENDERER_CACHE, cache)
+    if renderer is not None:
+        if renderer.name == best:
+            return renderer
+        renderer.close()
+    return create_renderer(best, window_size, logical_size, fps)
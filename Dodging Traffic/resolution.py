@@ -0,0 +1,101 @@
+import math
+import weakref
+
+import pygame
+
+# Internal resolution never drops below this fraction of the logical size
+MIN_SCALE = 0.5
+SCALE_STEP = 0.125
+# Frames to wait after a resolution change before measuring again
+COOLDOWN_FRAMES = 30
+
+
+# Largest rect with the logical aspect ratio that fits centered in the window
+def fit_rect(window_size, logical_size):
+    win_w, win_h = window_size
+    fit = min(win_w / logical_size[0], win_h / logical_size[1])
+    width, height = int(logical_size[0] * fit), int(logical_size[1] * fit)
+    return pygame.Rect((win_w - width) // 2, (win_h - height) // 2, width, height)
+
+
+# Renders into an internal surface whose resolution follows the frame budget.
+# Callers always pass logical (game) coordinates; present() stretches the internal
+# surface to the window once per frame.
+class Viewport:
+    def __init__(self, window, logical_size, fps):
+        self.window = window
+        self.logical_width, self.logical_height = logical_size
+        self.budget = 1000.0 / fps
+        self.frame_time = self.budget / 2
+        self.cooldown = COOLDOWN_FRAMES
+        # Scaled copies of assets, dropped automatically with the source surface
+        self.cache = weakref.WeakKeyDictionary()
+        self.fit_window()
+        self.set_scale(self.max_scale)
+
+    def fit_window(self):
+        self.window_size = self.window.get_size()
+        self.target = fit_rect(self.window_size, (self.logical_width, self.logical_height))
+        # Sprites are only as detailed as the logical size, rendering above it would
+        # just smoothscale the same pixels up; present() does the one upscale instead
+        self.max_scale = max(MIN_SCALE, min(1.0, self.target.width / self.logical_width))
+
+    def set_scale(self, scale):
+        self.scale = min(self.max_scale, max(MIN_SCALE, scale))
+        size = (round(self.logical_width * self.scale), round(self.logical_height * self.scale))
+        self.surface = pygame.Surface(size).convert()
+
+    def scaled(self, image):
+        if self.scale == 1.0:
+            return image
+        by_scale = self.cache.get(image)
+        if by_scale is None:
+            by_scale = self.cache[image] = {}
+        scaled = by_scale.get(self.scale)
+        if scaled is None:
+            width, height = image.get_size()
+            size = (max(1, math.ceil(width * self.scale)), max(1, math.ceil(height * self.scale)))
+            try:
+                scaled = pygame.transform.smoothscale(image, size)
+            except ValueError:
+                scaled = pygame.transform.scale(image, size)
+            by_scale[self.scale] = scaled
+        return scaled
+
+    def blit(self, image, pos):
+        self.surface.blit(self.scaled(image), (int(pos[0] * self.scale), int(pos[1] * self.scale)))
+
+    def fill(self, color):
+        self.surface.fill(color)
+
+    # Stretches the internal surface into the window, everything but the flip
+    def compose(self):
+        self.window = pygame.display.get_surface()
+        if self.window.get_size() != self.window_size:
+            # Window was resized, refit and clear the letterbox borders
+            self.fit_window()
+            self.window.fill((0, 0, 0))
+            if self.scale > self.max_scale:
+                self.set_scale(self.max_scale)
+        if self.surface.get_size() == self.target.size:
+            self.window.blit(self.surface, self.target.topleft)
+        else:
+            pygame.transform.scale(self.surface, self.target.size, self.window.subsurface(self.target))
+
+    def present(self):
+        self.compose()
+        pygame.display.flip()
+
+    def adjust(self, frame_ms):
+        # Smoothed frame time decides whether to trade resolution for speed or back
+        self.frame_time += (frame_ms - self.frame_time) * 0.1
+        if self.cooldown > 0:
+            self.cooldown -= 1
+            return
+        if self.frame_time > self.budget * 0.85 and self.scale > MIN_SCALE:
+            self.set_scale(self.scale - SCALE_STEP)
+        elif self.frame_time < self.budget * 0.5 and self.scale < self.max_scale:
+            self.set_scale(self.scale + SCALE_STEP)
+        else:
+            return
+        self.cooldown = COOLDOWN_FRAMES
@@ -0,0 +1,250 @@
+import atexit
+import bisect
+import collections
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+
+DB_PATH = "scores.db"
+# Entries per level kept in memory for the start screen
+TOP_K = 10
+# Most rows written in one transaction
+BATCH = 1000
+OUTCOMES = ("crash", "complete", "timeout")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    level INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    played_at REAL NOT NULL,
+    score INTEGER NOT NULL,
+    survival_time REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    crash_cause TEXT,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_level_score ON runs (level, score);
+CREATE INDEX IF NOT EXISTS runs_level_day_score ON runs (level, day, score);
+CREATE INDEX IF NOT EXISTS runs_source_level_score ON runs (source, level, score);
+-- Runs per score, kept by the writer in the same transaction as the runs.
+-- Scores are small integers, so percentiles add up a few hundred rows at most.
+CREATE TABLE IF NOT EXISTS score_counts (
+    level INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    source TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    PRIMARY KEY (level, day, source, score)
+) WITHOUT ROWID;
+"""
+
+INSERT = """
+INSERT INTO runs (level, day, played_at, score, survival_time, outcome, crash_cause, source)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+COUNT = """
+INSERT INTO score_counts (level, day, source, score, runs) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (level, day, source, score) DO UPDATE SET runs = runs + excluded.runs
+"""
+
+# Fills score_counts for a database written before the table existed
+BACKFILL = """
+INSERT INTO score_counts (level, day, source, score, runs)
+SELECT level, day, source, score, COUNT(*) FROM runs GROUP BY level, day, source, score
+"""
+
+
+def connect(path):
+    # Waits up to 10 s for another process writing the same file, e.g. a tournament
+    connection = sqlite3.connect(path, timeout=10)
+    # WAL lets the queries below read while the writer thread commits
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+# High scores and run statistics. record() only queues the row, a background
+# thread writes queued rows in batches, so the game loop never waits on disk.
+# leaderboard() answers from memory with the best kiosk scores; top() and
+# percentile() query the indexes.
+class ScoreStore:
+    def __init__(self, path=DB_PATH, top_k=TOP_K):
+        self.path = path
+        self.top_k = top_k
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.leaders = {}  # level -> ascending list of the best scores
+        self.local = threading.local()
+        self.ready = threading.Event()
+        self.failed = False
+        self.closed = False
+        self.writer = threading.Thread(target=self.write_loop, name="scores", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def record(self, level, score, survival_time, outcome, crash_cause=None, source="kiosk", played_at=None):
+        # Checked here, a row the database rejects would otherwise only show up on the writer thread
+        if outcome not in OUTCOMES:
+            raise ValueError(f"Unknown outcome: {outcome}")
+        played_at = time.time() if played_at is None else played_at
+        day = datetime.date.fromtimestamp(played_at).isoformat()
+        self.queue.put((level, day, played_at, score, survival_time, outcome, crash_cause, source))
+        if source == "kiosk":
+            self.remember(level, score)
+
+    def remember(self, level, score):
+        with self.lock:
+            leaders = self.leaders.setdefault(level, [])
+            if len(leaders) < self.top_k or score > leaders[0]:
+                bisect.insort(leaders, score)
+                del leaders[:-self.top_k]
+
+    def leaderboard(self, level):
+        with self.lock:
+            return self.leaders.get(level, [])[::-1]
+
+    def write_loop(self):
+        try:
+            connection = connect(self.path)
+            connection.executescript(SCHEMA)
+            # Warm the in-memory leaderboards before taking any writes
+            levels = [row[0] for row in connection.execute(
+                "SELECT DISTINCT level FROM runs WHERE source = 'kiosk'")]
+            for level in levels:
+                for (score,) in connection.execute(
+                        "SELECT score FROM runs WHERE source = 'kiosk' AND level = ? ORDER BY score DESC LIMIT ?",
+                        (level, self.top_k)):
+                    self.remember(level, score)
+        except sqlite3.Error as e:
+            # Scores still work for this session, they just aren't saved
+            print(f"Error opening score database: {self.path}. {e}")
+            connection = None
+            self.failed = True
+        self.ready.set()
+        if connection is not None:
+            # After the leaderboards, a large backfill doesn't hold up the menu
+            self.backfill(connection)
+
+        running = True
+        while running:
+            items = [self.queue.get()]
+            while len(items) < BATCH:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = []
+            waiting = []
+            for item in items:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    waiting.append(item)
+                else:
+                    rows.append(item)
+            try:
+                if rows and connection is not None:
+                    self.write(connection, rows)
+            finally:
+                # flush() and close() must return even if the write failed
+                for event in waiting:
+                    event.set()
+        if connection is not None:
+            connection.close()
+
+    def backfill(self, connection):
+        # The game and a tournament may open the same database at once. Taking the
+        # write lock first makes the emptiness check and the insert one step.
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                if connection.execute("SELECT 1 FROM score_counts LIMIT 1").fetchone() is None:
+                    connection.execute(BACKFILL)
+                connection.commit()
+            except sqlite3.Error:
+                connection.rollback()
+                raise
+        except sqlite3.Error as e:
+            # New runs are still saved and counted, only older ones are missing from percentiles
+            print(f"Error filling score counts: {self.path}. {e}")
+
+    def write(self, connection, rows):
+        try:
+            self.insert(connection, rows)
+        except sqlite3.Error as e:
+            # Write the rows one by one so a single bad row doesn't cost the batch
+            print(f"Error saving {len(rows)} scores, retrying one by one. {e}")
+            for row in rows:
+                try:
+                    self.insert(connection, [row])
+                except sqlite3.Error as e:
+                    print(f"Dropped score {row}. {e}")
+
+    def insert(self, connection, rows):
+        counts = collections.Counter((level, day, source, score)
+                                     for level, day, _, score, _, _, _, source in rows)
+        with connection:
+            connection.executemany(INSERT, rows)
+            connection.executemany(COUNT, [key + (runs,) for key, runs in counts.items()])
+
+    def flush(self):
+        # Blocks until everything recorded so far is on disk, never call it from the game loop
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.writer.join()
+
+    def connection(self):
+        # sqlite connections can't be shared across threads, each reader gets its own
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            self.ready.wait()
+            if self.failed:
+                return None
+            connection = self.local.connection = connect(self.path)
+        return connection
+
+    def where(self, level, day, source):
+        clause, args = "level = ?", (level,)
+        if day is not None:
+            clause, args = clause + " AND day = ?", args + (day,)
+        if source is not None:
+            clause, args = clause + " AND source = ?", args + (source,)
+        return clause, args
+
+    def top(self, level, k=TOP_K, day=None, source=None):
+        if self.connection() is None:
+            return []
+        clause, args = self.where(level, day, source)
+        return self.connection().execute(
+            f"SELECT score, survival_time, outcome, day, source FROM runs WHERE {clause} "
+            "ORDER BY score DESC LIMIT ?", args + (k,)).fetchall()
+
+    def percentile(self, level, p, day=None, source=None):
+        # Reads the per-score counts instead of the runs, so the cost depends on how
+        # many distinct scores (and days) there are, not on how many runs
+        connection = self.connection()
+        if connection is None:
+            return None
+        clause, args = self.where(level, day, source)
+        counts = connection.execute(
+            f"SELECT score, SUM(runs) FROM score_counts WHERE {clause} GROUP BY score ORDER BY score", args).fetchall()
+        total = sum(runs for _, runs in counts)
+        if not total:
+            return None
+        rank = min(total - 1, int(p / 100 * (total - 1) + 0.5))
+        seen = 0
+        for score, runs in counts:
+            seen += runs
+            if seen > rank:
+                return score
@@ -0,0 +1,312 @@
+# Headless self-play for difficulty tuning.
+#
+#   python tournament.py --grid sweep.json --out results/sweep [--workers 8]
+#   python tournament.py --summary results/sweep
+#
+# With --scores [path] every run is also recorded in the game's score
+# database (source "tournament"), next to the kiosk runs.
+#
+# The grid file lists what to sweep, every combination of level, policy and
+# parameter values is one config and is played once per seed:
+#
+#   {"levels": [2, 3], "policies": ["straight", "dodge"], "seeds": 500,
+#    "params": {"base_speed": [4, 5, 6], "burst": [[2, 3], [2, 4]]}}
+#
+# Results are appended to one file per column under --out as runs finish.
+# Running the same command again skips the runs that are already stored.
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from autopilot import Autopilot
+from dodging import FPS, LEVELS, Round, argument, hitbox_images
+from driving import SCREEN_WIDTH, KeyState
+from scores import DB_PATH, ScoreStore
+
+OUTCOMES = ("timeout", "crash", "complete")
+CRASH_CAUSES = ("none", "enemy", "rock", "slow_car", "same_direction")
+
+COLUMNS = (
+    ("run_id", "<i8"),
+    ("config_id", "<i4"),
+    ("seed", "<i8"),
+    ("survival_time", "<f4"),
+    ("coins", "<i4"),
+    ("outcome", "<i1"),
+    ("crash_cause", "<i1"),
+)
+
+DEFAULT_GRID = {"levels": [1, 2, 3], "policies": ["straight", "weave", "dodge", "autopilot"], "seeds": 100,
+                "params": {}}
+DEFAULT_OUT = os.path.join("results", "tournament")
+# A round that nobody finishes in this long counts as a timeout
+MAX_TIME = 120
+FLUSH_ROWS = 500
+
+
+# Driver policies: make(rng) returns a function from the Round to the keys for this frame
+
+def straight(rng):
+    keys = KeyState(up=True)
+    return lambda race: keys
+
+
+def weave(rng):
+    period = rng.randint(20, 60)
+    left, right = KeyState(left=True, up=True), KeyState(right=True, up=True)
+    return lambda race: left if (race.frame // period) % 2 else right
+
+
+def dodge(rng):
+    # Steer away from the closest car in the player's column, otherwise drift to the next coin
+    def drive(race):
+        player = race.player.rect
+        threats = [s.rect for group in (race.enemies, race.same_direction_enemies) for s in group
+                   if s.rect.bottom < player.bottom and player.top - s.rect.bottom < 250
+                   and s.rect.right + 20 > player.left and s.rect.left - 20 < player.right]
+        if threats:
+            closest = max(threats, key=lambda rect: rect.bottom)
+            go_left = closest.centerx > player.centerx
+            if go_left and player.left < 40:
+                go_left = False
+            elif not go_left and player.right > SCREEN_WIDTH - 40:
+                go_left = True
+            return KeyState(left=go_left, right=not go_left, up=True)
+        coins = [s.rect for s in race.coins if s.rect.bottom < player.bottom]
+        if coins:
+            target = max(coins, key=lambda rect: rect.bottom).centerx
+            if abs(target - player.centerx) > 10:
+                return KeyState(left=target < player.centerx, right=target > player.centerx, up=True)
+        return KeyState(up=True)
+    return drive
+
+
+def autopilot(rng):
+    return Autopilot()
+
+
+POLICIES = {"straight": straight, "weave": weave, "dodge": dodge, "autopilot": autopilot}
+
+
+def expand_grid(grid):
+    for name in grid["policies"]:
+        if name not in POLICIES:
+            raise ValueError(f"Unknown policy: {name}")
+    names = sorted(grid.get("params", {}))
+    for level in grid["levels"]:
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level: {level}")
+        # Round ignores keys it doesn't know, a typo would sweep identical configs
+        unknown = [name for name in names if name not in LEVELS[level]]
+        if unknown:
+            raise ValueError(f"Unknown parameters for level {level}: {', '.join(unknown)}")
+    values = [grid["params"][name] for name in names]
+    configs = []
+    for level, policy in itertools.product(grid["levels"], grid["policies"]):
+        for combo in itertools.product(*values):
+            params = {name: tuple(v) if isinstance(v, list) else v for name, v in zip(names, combo)}
+            configs.append({"level": level, "policy": policy, "params": params})
+    return configs
+
+
+def run_specs(configs, seeds):
+    run_id = 0
+    for config_id, config in enumerate(configs):
+        for seed in range(seeds):
+            yield run_id, config_id, config["level"], config["policy"], seed, config["params"]
+            run_id += 1
+
+
+images = None
+
+
+def init_worker():
+    global images
+    images = hitbox_images()
+
+
+def play(spec):
+    run_id, config_id, level, policy, seed, params = spec
+    race = Round(level, images, params, random.Random(seed))
+    drive = POLICIES[policy](random.Random(seed + 1_000_003))
+    max_frames = MAX_TIME * FPS
+    while race.outcome is None and race.frame < max_frames:
+        race.step(drive(race))
+    return (run_id, config_id, seed, race.time, race.score,
+            OUTCOMES.index(race.outcome or "timeout"), CRASH_CAUSES.index(race.crash_cause or "none"))
+
+
+# Append-only column files. Rows are buffered and written in batches; on open,
+# every column is cut back to the shortest one so a half-written batch from an
+# interrupted run is dropped and simply played again.
+class ResultStore:
+    def __init__(self, path):
+        self.path = path
+        self.pending = []
+        os.makedirs(path, exist_ok=True)
+        self.rows = min(self.column_rows(name, dtype) for name, dtype in COLUMNS)
+        for name, dtype in COLUMNS:
+            with open(self.column_path(name), "ab") as f:
+                f.truncate(self.rows * np.dtype(dtype).itemsize)
+
+    def column_path(self, name):
+        return os.path.join(self.path, name + ".bin")
+
+    def column_rows(self, name, dtype):
+        try:
+            return os.path.getsize(self.column_path(name)) // np.dtype(dtype).itemsize
+        except OSError:
+            return 0
+
+    def append(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= FLUSH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        columns = list(zip(*self.pending))
+        for (name, dtype), values in zip(COLUMNS, columns):
+            with open(self.column_path(name), "ab") as f:
+                np.asarray(values, dtype=dtype).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+        self.rows += len(self.pending)
+        self.pending = []
+
+    def load(self):
+        self.flush()
+        return {name: np.fromfile(self.column_path(name), dtype=dtype, count=self.rows)
+                for name, dtype in COLUMNS}
+
+
+def load_meta(out, grid):
+    meta_path = os.path.join(out, "meta.json")
+    try:
+        configs = expand_grid(grid)
+    except ValueError as e:
+        sys.exit(str(e))
+    meta = {"grid": grid, "configs": configs, "outcomes": OUTCOMES, "crash_causes": CRASH_CAUSES}
+    # Round-trip through JSON so tuples compare equal to what was stored
+    meta = json.loads(json.dumps(meta))
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            stored = json.load(f)
+        if stored != meta:
+            sys.exit(f"{out} holds results for a different grid, pick another --out")
+    else:
+        os.makedirs(out, exist_ok=True)
+        with open(meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+    return meta
+
+
+def run(grid, out, workers, scores=None):
+    meta = load_meta(out, grid)
+    store = ResultStore(out)
+    done = set(store.load()["run_id"].tolist())
+    pending = [spec for spec in run_specs(expand_grid(grid), grid["seeds"]) if spec[0] not in done]
+    total = len(pending) + len(done)
+    print(f"{len(meta['configs'])} configs, {total} runs, {len(done)} already stored, {workers} workers")
+
+    started = time.perf_counter()
+    finished = 0
+    pool = multiprocessing.Pool(workers, initializer=init_worker)
+    try:
+        for row in pool.imap_unordered(play, pending, chunksize=16):
+            store.append(row)
+            if scores:
+                config = meta["configs"][row[1]]
+                scores.record(config["level"], row[4], row[3], OUTCOMES[row[5]],
+                              None if row[6] == 0 else CRASH_CAUSES[row[6]], source="tournament")
+            finished += 1
+            if finished % 1000 == 0:
+                rate = finished / (time.perf_counter() - started)
+                print(f"{len(done) + finished}/{total} runs, {rate:.0f} runs/s")
+        pool.close()
+    except KeyboardInterrupt:
+        print("Interrupted, storing finished runs. Run again to resume.")
+        pool.terminate()
+        raise
+    finally:
+        store.flush()
+        pool.join()
+        if scores:
+            scores.close()
+    summarize(out)
+
+
+def summarize(out):
+    meta_path = os.path.join(out, "meta.json")
+    if not os.path.exists(meta_path):
+        sys.exit(f"No results in {out}")
+    with open(meta_path) as f:
+        meta = json.load(f)
+    data = ResultStore(out).load()
+    if not len(data["run_id"]):
+        print("No results yet")
+        return
+    crash = OUTCOMES.index("crash")
+
+    print(f"{'id':>4} {'lvl':>3} {'policy':<9} {'runs':>6} {'crash%':>7} {'done%':>6} "
+          f"{'t p10':>6} {'t p50':>6} {'t p90':>6} {'coins':>6}  {'top cause':<14}  params")
+    # Group the rows by config once instead of scanning every row for every config
+    order = np.argsort(data["config_id"], kind="stable")
+    counts = np.bincount(data["config_id"], minlength=len(meta["configs"]))
+    ends = np.cumsum(counts)
+    by_level = {}
+    for config_id, config in enumerate(meta["configs"]):
+        runs = int(counts[config_id])
+        if not runs:
+            continue
+        rows = order[ends[config_id] - runs:ends[config_id]]
+        outcome = data["outcome"][rows]
+        crash_rate = float((outcome == crash).mean())
+        complete_rate = float((outcome == OUTCOMES.index("complete")).mean())
+        p10, p50, p90 = np.percentile(data["survival_time"][rows], [10, 50, 90])
+        causes = np.bincount(data["crash_cause"][rows][outcome == crash], minlength=len(CRASH_CAUSES))
+        top = CRASH_CAUSES[int(causes.argmax())] if causes.any() else "-"
+        by_level.setdefault(config["level"], []).append(crash_rate)
+        print(f"{config_id:>4} {config['level']:>3} {config['policy']:<9} {runs:>6} {crash_rate * 100:>6.1f}% "
+              f"{complete_rate * 100:>5.1f}% {p10:>6.1f} {p50:>6.1f} {p90:>6.1f} "
+              f"{data['coins'][rows].mean():>6.1f}  {top:<14}  {json.dumps(config['params'])}")
+
+    # How spread out the crash rate is over the configs of each level
+    print()
+    for level, rates in sorted(by_level.items()):
+        rates = np.array(rates) * 100
+        print(f"level {level}: crash rate over {len(rates)} configs "
+              f"min {rates.min():.1f}% p25 {np.percentile(rates, 25):.1f}% median {np.median(rates):.1f}% "
+              f"p75 {np.percentile(rates, 75):.1f}% max {rates.max():.1f}%")
+
+
+if __name__ == "__main__":
+    out = argument("--out", DEFAULT_OUT)
+    if "--summary" in sys.argv:
+        summarize(argument("--summary", out))
+        sys.exit()
+    grid = DEFAULT_GRID
+    if "--grid" in sys.argv:
+        path = argument("--grid")
+        if path is None:
+            sys.exit("--grid needs a file, e.g. --grid sweep.json")
+        with open(path) as f:
+            grid = dict(DEFAULT_GRID, **json.load(f))
+    try:
+        workers = int(argument("--workers", os.cpu_count() or 1))
+    except ValueError:
+        sys.exit("--workers must be a number")
+    scores = None
+    if "--scores" in sys.argv:
+        scores = ScoreStore(argument("--scores", DB_PATH))
+    try:
+        run(grid, out, workers, scores)
+    except KeyboardInterrupt:
+        sys.exit(1)